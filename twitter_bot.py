@@ -1,17 +1,162 @@
 import os
+import functools
+import hashlib
+import heapq
 import logging
+import logging.handlers
+import queue
 import random
+import threading
 import time
 import json
-import schedule
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from requests_oauthlib import OAuth1Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, date, timedelta  # Corrected import statement
 import re
-from groq import Groq
-import gspread
-from google.oauth2.service_account import Credentials
-from dateutil import parser
+
+# groq/httpx and the gspread/google-auth stack are imported lazily in
+# setup_groq/setup_sheet: they cost hundreds of ms of import time, which
+# is pure overhead when a short-lived CI run exits early on missing creds.
+
+# Compiled once so the hot tweet-cleaning path skips re-parsing per call
+_LEAD_IN_RE = re.compile(
+    r'^(Here\'s|Here is|Tweet:|Thought:|Here\'s a thought:|Quick thought:|Check out this insight:|'
+    r'Here is your tweet:|Here\'s a tweet for you:|Insight:|Note:|Observation:|Quick tip:|'
+    r'Pro tip:|Reminder:|Hot take:|Real talk:)',
+    re.IGNORECASE
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _tweet_tokens(text):
+    """Normalized token set used for near-duplicate comparison."""
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+def _tweet_fingerprint(text):
+    """Stable 8-byte digest used for exact-duplicate membership.
+
+    Deterministic across processes (unlike salted hash()) and keeps the
+    set under ~1 MB even for 100k tweets.
+    """
+    return hashlib.blake2s(text.encode(), digest_size=8).digest()
+
+
+@functools.lru_cache(maxsize=512)
+def _normalize_tweet_text(text):
+    """Deterministic cleanup: strip lead-ins, collapse whitespace, truncate.
+
+    Memoized so regeneration loops over similar fallback/LLM output only
+    pay for the regex work once per distinct input.
+    """
+    # Fast path: most Groq responses come back already clean and in
+    # range, so skip the regex work when there is nothing to fix.
+    if (text and len(text) <= 280 and text == text.strip()
+            and '\n' not in text and '  ' not in text
+            and not text.startswith(('"', "'"))
+            and not _LEAD_IN_RE.match(text)):
+        return text
+
+    text = _LEAD_IN_RE.sub('', text).strip()
+    text = _WHITESPACE_RE.sub(' ', text)
+    text = text.strip('"\' \n')
+
+    if len(text) > 280:
+        # Single ranged rfind, one slice: prefer breaking at a space past
+        # position 200, otherwise hard-cut at 277.
+        cut = text.rfind(' ', 200, 277)
+        text = (text[:cut] if cut > 0 else text[:277]) + "..."
+
+    return text
+
+
+def _next_fire_epoch(time_str):
+    """Epoch seconds of the next local occurrence of 'HH:MM' (or 'HH:MM:SS')."""
+    parts = [int(p) for p in time_str.split(':')]
+    if not 1 < len(parts) < 4:
+        raise ValueError(f"invalid schedule time: {time_str!r}")
+    now = datetime.now()
+    fire = now.replace(hour=parts[0], minute=parts[1],
+                       second=parts[2] if len(parts) > 2 else 0, microsecond=0)
+    if fire <= now:
+        fire += timedelta(days=1)
+    return fire.timestamp()
+
+# How long a cached Groq completion may be reused, and how many to keep
+LLM_CACHE_TTL = 6 * 60 * 60
+LLM_CACHE_MAX = 128
+
+# Groq models by speed tier; a 280-char tweet does not need the 70B model.
+# GROQ_SPEED_TIER picks a tier (or names a model directly).
+GROQ_SPEED_TIERS = {
+    "instant": "llama-3.1-8b-instant",
+    "balanced": "llama-3.3-70b-versatile",
+    "fast70b": "llama-3.3-70b-specdec",
+}
+
+# All static instructions live here so every request shares an identical
+# prefix (provider prompt caches only hit on exact prefix matches); the
+# user message carries only the per-request topic and style.
+GROQ_SYSTEM_PROMPT = (
+    "You are a business-focused data analyst who writes concise, human-like Twitter posts. "
+    "Write tweets as if they are drawn from real experience, include outcomes, insights, or lessons learned. "
+    "Focus on practical business impact in areas like retail, inventory, transport, forecasting, sales, and operations. "
+    "Avoid generic advice or beginner tutorials. Avoid teaching. Avoid technical lectures. "
+    "Requirements: under 280 characters, business-focused, practical, and impactful. "
+    "Keep it authentic and experience-driven. Don't include hashtags unless specifically relevant. "
+    "Return only the tweet text, nothing else."
+)
+
+# Built once; every request reuses the same dict instead of rebuilding it.
+_SYSTEM_MESSAGE = {"role": "system", "content": GROQ_SYSTEM_PROMPT}
+
+HASHTAGS = ('#DataScience', '#Analytics', '#DemandForecasting',
+            '#FleetOptimization', '#BusinessIntelligence', '#RetailAnalytics',
+            '#InventoryManagement', '#SupplyChain', '#DataAnalytics')
+
+FALLBACK_TEMPLATES = (
+    "{topic} can reveal operational inefficiencies faster than most teams expect.",
+    "Many businesses overlook {topic}, yet it directly impacts cost, performance, and decision quality.",
+    "Improving {topic} often leads to clearer insights and better resource allocation.",
+    "Strong {topic} practices give companies a measurable advantage in planning and execution.",
+    "When {topic} is optimized, teams make faster, more confident decisions.",
+    "{topic} is one of the simplest ways to identify patterns that drive revenue or reduce waste.",
+    "Companies underestimate how much {topic} can improve forecasting and day-to-day operations.",
+)
+
+DEFAULT_TWEET_STYLES = (
+    "I saw firsthand that {topic} led to measurable improvements in operations.",
+    "From my experience, {topic} helped reduce costs and improve efficiency.",
+    "In one project, focusing on {topic} delivered tangible results.",
+    "While managing {topic}, I discovered a key insight that improved performance.",
+    "Through practical experience, optimizing {topic} often leads to big gains.",
+    "One lesson I learned about {topic}: small adjustments can have significant impact.",
+    "Working with {topic} taught me how to save time, resources, and costs.",
+    "Experience shows that {topic} directly affects decision-making and outcomes.",
+    "I’ve found that prioritizing {topic} uncovers hidden inefficiencies.",
+    "During past projects, improving {topic} delivered measurable business success.",
+)
+
+DEFAULT_TOPICS = (
+    "Reducing stockouts and overstock by tracking days of stock on hand",
+    "Optimizing transport costs through cost-per-trip and route analysis",
+    "Analyzing sales data to uncover slow-moving products",
+    "Predicting customer returns to prevent revenue loss",
+    "Tracking fleet performance and vehicle utilization for cost savings",
+    "Improving supplier performance using data insights",
+    "Forecasting demand to improve purchasing decisions",
+    "Identifying hidden inefficiencies in operations dashboards",
+    "Early warning signals for customer churn",
+    "Using inventory ABC analysis to free up working capital",
+    "Optimizing delivery schedules to reduce operational costs",
+    "Analyzing pricing strategies to increase profit margins",
+    "Monitoring key KPIs to improve business decision-making",
+    "Using historical sales data to improve forecast accuracy",
+)
 
 # ====== GOOGLE SHEETS CONFIGURATION ======
 # Make sure to set this in your GitHub Secrets as SHEET_ID
@@ -19,32 +164,87 @@ SHEET_ID = "1E1P_V1LqnE9nDhVhInB8zHu_P3pd-0HZzjkZN6ud8k0"
 WORKSHEET_NAME = "Twitter_Bot_Memory"
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
-    handlers=[logging.StreamHandler()] + ([logging.FileHandler('twitter_bot.log')] if os.environ.get('LOG_FILE') else [])
-)
+_LOG_LISTENER = None
+
+logger = logging.getLogger("twitter_bot")
+
+def _configure_logging():
+    """Route records through a queue so log I/O never blocks the bot thread."""
+    global _LOG_LISTENER
+
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s')
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    sinks = [stream_handler]
+    if os.environ.get('LOG_FILE', '').lower() not in ('', '0', 'false', 'no'):
+        file_handler = logging.FileHandler('twitter_bot.log')
+        file_handler.setFormatter(formatter)
+        # Buffer records so every log line is not a synchronous disk write
+        sinks.append(logging.handlers.MemoryHandler(
+            capacity=100,
+            flushLevel=logging.ERROR,
+            target=file_handler,
+        ))
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _LOG_LISTENER = logging.handlers.QueueListener(log_queue, *sinks)
+    _LOG_LISTENER.start()
 
 class TwitterBot:
     def __init__(self):
         self.oauth = None
         self.groq_client = None
         self.sheet = None
-        self.posted_tweets = set()
+        # Dedup state holds per-tweet fingerprints and token sets, not full text
+        self.posted_hashes = set()
+        self._posted_token_sets = []
+        self._recent_topics = None
+        self._recent_topics_built_at = 0
+        self._pregenerated = {}
+        self._rows = []
+        self._pending_rows = []
+        self._posted_lock = threading.Lock()
+        self._llm_cache = {}
+        self._groq_rate_limit_error = ()  # replaced with groq.RateLimitError in setup_groq
+        self._groq_kwargs = {}  # filled in setup_groq
+
+        # Parse env-configured lists once instead of per generation call
+        tweet_styles_str = os.environ.get('TWEET_STYLES')
+        self.tweet_styles = json.loads(tweet_styles_str) if tweet_styles_str else DEFAULT_TWEET_STYLES
+        topics_str = os.environ.get('TOPICS')
+        self.topics = json.loads(topics_str) if topics_str else DEFAULT_TOPICS
+
+        self._topic_cycle = deque()
+
+        tier = os.environ.get('GROQ_SPEED_TIER', 'instant')
+        self.groq_model = GROQ_SPEED_TIERS.get(tier, tier)
+
+        self.schedule_times = json.loads(os.environ.get('SCHEDULE_TIMES', '["09:00", "14:00", "18:00"]'))
+        self.run_duration_hours = float(os.environ.get('RUN_DURATION_HOURS', '24'))
+        self.post_immediately = os.environ.get('POST_IMMEDIATELY', 'false').lower() == 'true'
+        self.pregenerate = os.environ.get('PREGENERATE_TWEETS', 'false').lower() == 'true'
         self.setup_oauth()
         self.setup_groq()
         self.setup_sheet()
 
     def setup_oauth(self):
-        """Setup Twitter OAuth session"""
-        logging.info("➡️ Setting up Twitter OAuth")
+        """Setup Twitter OAuth session (once per bot instance)"""
+        if self.oauth:
+            return
+        # Deferred: pulls in oauthlib and friends only when actually posting
+        from requests_oauthlib import OAuth1Session
+
+        logger.info("➡️ Setting up Twitter OAuth")
         consumer_key = os.environ.get("TWITTER_API_KEY")
         consumer_secret = os.environ.get("TWITTER_API_SECRET")
         access_token = os.environ.get("TWITTER_ACCESS_TOKEN")
         access_token_secret = os.environ.get("TWITTER_ACCESS_SECRET")
 
         if not all([consumer_key, consumer_secret, access_token, access_token_secret]):
-            logging.error("❌ Missing Twitter API credentials as environment variables.")
+            logger.error("❌ Missing Twitter API credentials as environment variables.")
             return
 
         self.oauth = OAuth1Session(
@@ -53,27 +253,62 @@ class TwitterBot:
             resource_owner_key=access_token,
             resource_owner_secret=access_token_secret,
         )
+        # Keep-alive pooling so repeated posts reuse the TLS connection,
+        # with automatic retries on transient Twitter API errors.
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=10,
+            # Connection-level retries only; status-based retries are
+            # handled in post_tweet where the rate-limit headers are visible.
+            max_retries=Retry(connect=3, backoff_factor=0.5),
+        )
+        self.oauth.mount("https://", adapter)
 
     def setup_groq(self):
         """Setup Groq client"""
         groq_api_key = os.environ.get("GROQ_API_KEY")
         if not groq_api_key:
-            logging.error("❌ Groq API key not found in environment (GROQ_API_KEY).")
+            logger.error("❌ Groq API key not found in environment (GROQ_API_KEY).")
             return
         try:
-            self.groq_client = Groq(api_key=groq_api_key)
-            logging.info("✅ Groq client initialized successfully.")
+            import httpx
+            from groq import Groq, RateLimitError
+
+            self._groq_rate_limit_error = RateLimitError
+            # Static completion kwargs, built once; only the messages list
+            # changes per call.
+            self._groq_kwargs = {
+                "model": self.groq_model,
+                "max_completion_tokens": 80,  # 280 chars is roughly 70 tokens
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "stream": True,
+            }
+            # Persistent keep-alive pool so LLM calls over a long run reuse
+            # one TLS connection instead of re-handshaking each time.
+            self.groq_client = Groq(
+                api_key=groq_api_key,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_keepalive_connections=10),
+                    timeout=30,
+                ),
+            )
+            logger.info("✅ Groq client initialized successfully.")
         except Exception as e:
-            logging.error(f"❌ Failed to initialize Groq client: {e}")
+            logger.error("❌ Failed to initialize Groq client: %s", e)
 
     def setup_sheet(self):
         """Setup Google Sheets connection."""
         try:
             google_creds_json = os.getenv("GOOGLE_CREDS_JSON")
             if not google_creds_json or not SHEET_ID:
-                logging.error("❌ Missing Google Sheets credentials or sheet ID.")
+                logger.error("❌ Missing Google Sheets credentials or sheet ID.")
                 return
 
+            import gspread
+            from google.oauth2.service_account import Credentials
+            from google.auth.transport.requests import AuthorizedSession
+
             creds_dict = json.loads(google_creds_json)
             creds = Credentials.from_service_account_info(
                 creds_dict,
@@ -82,227 +317,348 @@ class TwitterBot:
                     "https://www.googleapis.com/auth/drive",
                 ],
             )
-            client = gspread.authorize(creds)
+            # Pooled session so Sheets calls reuse one TLS connection
+            authed = AuthorizedSession(creds)
+            authed.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+            client = gspread.Client(auth=creds, session=authed)
             self.sheet = client.open_by_key(SHEET_ID).worksheet(WORKSHEET_NAME)
-            logging.info("✅ Google Sheet connected successfully.")
+            logger.info("✅ Google Sheet connected successfully.")
+            self._load_sheet_rows()
+            self._load_posted_history()
         except Exception as e:
-            logging.error(f"❌ Failed to connect to Google Sheet: {e}")
+            logger.error("❌ Failed to connect to Google Sheet: %s", e)
+
+    def _load_sheet_rows(self):
+        """Fetch the recent tail of the sheet once; later reads use this copy.
+
+        Only the last few days matter for topic dedup and the posted-tweet
+        history is bounded anyway, so cap the payload at the last 500 rows
+        instead of downloading the whole (ever-growing) sheet.
+        """
+        try:
+            # row_count is the worksheet's grid size (1000 on a default
+            # sheet), not the last row holding data; windowing from it
+            # would fetch blank cells. Find the real data extent first.
+            last_row = len(self.sheet.col_values(1))
+            if last_row < 2:  # header only (or empty sheet)
+                self._rows = []
+                return
+            start = max(2, last_row - 500)  # row 1 is the header
+            # Only date, topic and tweet text are ever read back; leaving
+            # out the tweet-id column trims the payload further.
+            self._rows = self.sheet.get(f"A{start}:C{last_row}") or []
+        except Exception as e:
+            logger.error("❌ Error fetching sheet rows: %s", e)
+            self._rows = []
+
+    def _load_posted_history(self):
+        """Seed the duplicate-tweet state from the sheet so dedup survives restarts."""
+        posted = [row[2] for row in self._rows if len(row) >= 3 and row[2]]
+        self.posted_hashes = {_tweet_fingerprint(t) for t in posted}
+        self._posted_token_sets = [_tweet_tokens(t) for t in posted]
+        logger.info("🧠 Loaded %d previously posted tweets for dedup.", len(posted))
+
+    def _is_duplicate(self, tweet):
+        """Exact match or near-duplicate (token Jaccard > 0.8) of a posted tweet."""
+        if _tweet_fingerprint(tweet) in self.posted_hashes:
+            return True
+        tokens = _tweet_tokens(tweet)
+        if not tokens:
+            return False
+        for posted in self._posted_token_sets:
+            union = len(tokens | posted)
+            if union and len(tokens & posted) / union > 0.8:
+                return True
+        return False
 
     def mark_posted(self, topic, tweet_content, tweet_id=None):
-        """Append a log row: [YYYY-MM-DD, Topic, TweetContent, TweetID]"""
+        """Buffer a log row: [YYYY-MM-DD, Topic, TweetContent, TweetID]"""
         if not self.sheet:
             return
         # This line is now correct, using date.today() from the datetime module
         today = date.today().isoformat()
+        row = [today, topic, tweet_content, tweet_id or ""]
+        self._rows.append(row)
+        if self._recent_topics is not None:
+            self._recent_topics.add(topic)
+        self._pending_rows.append(row)
+        logger.info("📝 Post buffered for the Google Sheet log.")
+        if len(self._pending_rows) >= 5:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        """Write all buffered log rows to the sheet in one batched call."""
+        if not self.sheet or not self._pending_rows:
+            return
         try:
-            self.sheet.append_row([today, topic, tweet_content, tweet_id or ""])
-            logging.info("📝 Post logged to Google Sheet.")
+            self.sheet.append_rows(self._pending_rows, value_input_option="RAW")
+            logger.info("📝 Flushed %d post log row(s) to Google Sheet.", len(self._pending_rows))
+            self._pending_rows = []
         except Exception as e:
-            logging.error(f"❌ Error logging post to Google Sheet: {e}")
+            logger.error("❌ Error flushing post log to Google Sheet: %s", e)
+
+    def _load_recent_topics(self):
+        """Rebuild the recent-topic set from the locally cached rows."""
+        self._recent_topics = set()
+        self._recent_topics_built_at = time.time()
+        # Compute the window once per rebuild, not per row
+        cutoff = date.today() - timedelta(days=4)
+
+        for row in self._rows:
+            if len(row) < 2:
+                continue
+            try:
+                # Rows are written as ISO YYYY-MM-DD, a format we control;
+                # fromisoformat is the C fast path.
+                post_date = date.fromisoformat(row[0][:10])
+            except ValueError:
+                continue
+
+            if post_date >= cutoff:
+                self._recent_topics.add(row[1])
 
     def already_posted_topic(self, topic):
-        """Check if the same topic has been posted within the last 2 days."""
-        if not self.sheet:
-            return False
-        
-        try:
-            rows = self.sheet.get_all_values()[1:]  # skip header
-            # This line is now correct, using date.today() from the datetime module
-            today = date.today()
-            # This line is now correct, using timedelta from the datetime module
-            two_days_ago = today - timedelta(days=4)
-            
-            for row in rows:
-                if len(row) < 2:
-                    continue
-                try:
-                    post_date = parser.parse(row[0]).date()
-                except Exception:
-                    continue
-                
-                posted_topic = row[1]
-                if post_date >= two_days_ago and posted_topic == topic:
-                    return True
-            return False
-        except Exception as e:
-            logging.error(f"❌ Error checking for posted topics: {e}")
-            return False
+        """Check if the same topic has been posted within the dedup window."""
+        if self._recent_topics is None:
+            self._load_recent_topics()
+        return topic in self._recent_topics
 
     def clean_tweet_text(self, text):
         """Clean and format tweet text"""
-        text = re.sub(
-            r'^(Here\'s|Here is|Tweet:|Thought:|Here\'s a thought:|Quick thought:|Check out this insight:|'
-            r'Here is your tweet:|Here\'s a tweet for you:|Insight:|Note:|Observation:|Quick tip:|'
-            r'Pro tip:|Reminder:|Hot take:|Real talk:)',
-            '',
-            text,
-            flags=re.IGNORECASE
-        ).strip()
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip('"\' \n')
+        text = _normalize_tweet_text(text)
 
         if '#' not in text and random.random() < 0.3:
-            hashtags = ['#DataScience', '#Analytics', '#DemandForecasting',
-                        '#FleetOptimization', '#BusinessIntelligence', '#RetailAnalytics', '#InventoryManagement', '#SupplyChain', '#DataAnalytics']
-            text += f" {random.choice(hashtags)}"
-
-        if len(text) > 280:
-            text = text[:277] + "..."
-            last_space = text.rfind(' ')
-            if last_space > 200:
-                text = text[:last_space] + "..."
+            tag = random.choice(HASHTAGS)
+            if len(text) + len(tag) + 1 <= 280:
+                text += f" {tag}"
 
         return text
 
     def generate_tweet_with_groq(self, topic):
         """Generate tweet using Groq Python SDK"""
         if not self.groq_client:
-            logging.error("❌ Groq client not initialized.")
+            logger.error("❌ Groq client not initialized.")
             return None
 
-        tweet_styles_str = os.environ.get('TWEET_STYLES')
-        tweet_styles = json.loads(tweet_styles_str) if tweet_styles_str else [
-            "I saw firsthand that {topic} led to measurable improvements in operations.",
-            "From my experience, {topic} helped reduce costs and improve efficiency.",
-            "In one project, focusing on {topic} delivered tangible results.",
-            "While managing {topic}, I discovered a key insight that improved performance.",
-            "Through practical experience, optimizing {topic} often leads to big gains.",
-            "One lesson I learned about {topic}: small adjustments can have significant impact.",
-            "Working with {topic} taught me how to save time, resources, and costs.",
-            "Experience shows that {topic} directly affects decision-making and outcomes.",
-            "I’ve found that prioritizing {topic} uncovers hidden inefficiencies.",
-            "During past projects, improving {topic} delivered measurable business success."
-        ]
+        selected_style = random.choice(self.tweet_styles).format(topic=topic)
 
-        selected_style = random.choice(tweet_styles).format(topic=topic)
+        messages = [
+            _SYSTEM_MESSAGE,
+            {
+                "role": "user",
+                "content": f"Topic: {topic}\nStyle hint: {selected_style}"
+            }
+        ]
 
-        prompt = (
-            f"Write a concise Twitter post about {topic}. {selected_style} "
-            f"Requirements: Under 280 characters, business-focused, practical, and impactful. "
-            f"Keep it authentic and experience-driven. Don't include hashtags unless specifically relevant. Just return the tweet text, nothing else."
-        )
+        # Response cache: the (topic, style) space is small, so identical
+        # requests within the TTL reuse the completion instead of paying
+        # Groq latency again. Tweets already posted never hit the cache.
+        cache_key = hashlib.sha256(json.dumps(
+            {"model": self.groq_model, "messages": messages, "temperature": 0.7},
+            sort_keys=True).encode()).hexdigest()
+        cached = self._llm_cache.get(cache_key)
+        if cached:
+            cached_tweet, cached_at = cached
+            with self._posted_lock:
+                reusable = (time.time() - cached_at < LLM_CACHE_TTL
+                            and _tweet_fingerprint(cached_tweet) not in self.posted_hashes)
+            if reusable:
+                logger.info("⚡ LLM cache hit for topic: %s", topic)
+                return cached_tweet
+            del self._llm_cache[cache_key]
+
+        logger.info("🧠 Generating tweet for topic: %s using Groq client.", topic)
+
+        raw_tweet = None
+        for attempt in range(2):
+            try:
+                response = self.groq_client.chat.completions.create(
+                    messages=messages, **self._groq_kwargs
+                )
+
+                # Consume the stream but stop paying for tokens as soon as the
+                # text is over budget or hits a line break (tweets are one line).
+                buffer = []
+                length = 0
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if '\n' in delta:
+                        buffer.append(delta.split('\n', 1)[0])
+                        response.close()
+                        break
+                    buffer.append(delta)
+                    length += len(delta)
+                    if length > 300:  # 280-char cap plus slack for clean truncation
+                        response.close()
+                        break
+
+                raw_tweet = ''.join(buffer).strip()
+                break
+            except self._groq_rate_limit_error as e:
+                if attempt == 0:
+                    wait = 2 ** attempt + random.random()
+                    logger.warning("⚠️ Groq rate limit hit, retrying in %.1fs...", wait)
+                    time.sleep(wait)
+                    continue
+                logger.error("❌ Groq tweet generation failed: %s", e)
+                return self.generate_fallback_tweet(topic)
+            except Exception as e:
+                logger.error("❌ Groq tweet generation failed: %s", e)
+                return self.generate_fallback_tweet(topic)
 
-        logging.info(f"🧠 Generating tweet for topic: {topic} using Groq client.")
+        if not raw_tweet:
+            return self.generate_fallback_tweet(topic)
 
         try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {
-                        "role": "system",
-                       "content": """You are a business-focused data analyst who writes concise, human-like Twitter posts.
-Write tweets as if they are drawn from real experience, include outcomes, insights, or lessons learned.
-Focus on practical business impact in areas like retail, inventory, transport, forecasting, sales, and operations.
-Avoid generic advice or beginner tutorials. Avoid teaching. Avoid technical lectures.
-Return only the tweet content, no hashtags, no explanations."""
-},
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_completion_tokens=200,
-                temperature=0.7,
-                top_p=0.9
-            )
-
-            raw_tweet = response.choices[0].message.content.strip()
             tweet = self.clean_tweet_text(raw_tweet)
 
-            if tweet in self.posted_tweets:
-                logging.warning("⚠️ Duplicate tweet detected, regenerating...")
+            with self._posted_lock:
+                is_duplicate = self._is_duplicate(tweet)
+            if is_duplicate:
+                logger.warning("⚠️ Duplicate tweet detected, regenerating...")
                 return self.generate_fallback_tweet(topic)
 
-            if 10 < len(tweet) <= 280:
-                logging.info(f"✅ Generated tweet ({len(tweet)} chars): {tweet}")
+            tweet_len = len(tweet)
+            if 10 < tweet_len <= 280:
+                if len(self._llm_cache) >= LLM_CACHE_MAX:
+                    self._llm_cache.pop(next(iter(self._llm_cache)))
+                self._llm_cache[cache_key] = (tweet, time.time())
+                logger.info("✅ Generated tweet (%d chars): %s", tweet_len, tweet)
                 return tweet
             else:
-                logging.warning(f"⚠️ Tweet length issue ({len(tweet)} chars). Using fallback.")
+                logger.warning("⚠️ Tweet length issue (%d chars). Using fallback.", tweet_len)
                 return self.generate_fallback_tweet(topic)
 
         except Exception as e:
-            logging.error(f"❌ Groq tweet generation failed: {e}")
+            logger.error("❌ Groq tweet generation failed: %s", e)
             return self.generate_fallback_tweet(topic)
 
     def generate_fallback_tweet(self, topic):
         """Generate a simple fallback tweet when AI generation fails"""
-        fallback_templates = [
-            f"{topic} can reveal operational inefficiencies faster than most teams expect.",
-            f"Many businesses overlook {topic}, yet it directly impacts cost, performance, and decision quality.",
-            f"Improving {topic} often leads to clearer insights and better resource allocation.",
-            f"Strong {topic} practices give companies a measurable advantage in planning and execution.",
-            f"When {topic} is optimized, teams make faster, more confident decisions.",
-            f"{topic} is one of the simplest ways to identify patterns that drive revenue or reduce waste.",
-            f"Companies underestimate how much {topic} can improve forecasting and day-to-day operations."
-        ]
-
-        tweet = random.choice(fallback_templates)
+        tweet = random.choice(FALLBACK_TEMPLATES).format(topic=topic)
         tweet = self.clean_tweet_text(tweet)
-        logging.info(f"🔄 Using fallback tweet: {tweet}")
+        logger.info("🔄 Using fallback tweet: %s", tweet)
         return tweet
 
     def post_tweet(self, tweet_text):
         """Post tweet to Twitter and return the tweet ID"""
         if not self.oauth or not tweet_text:
-            logging.error("❌ Cannot post tweet. Missing OAuth or tweet text.")
+            logger.error("❌ Cannot post tweet. Missing OAuth or tweet text.")
             return None
 
         payload = {"text": tweet_text}
 
-        try:
-            response = self.oauth.post("https://api.twitter.com/2/tweets", json=payload, timeout=30)
+        for attempt in range(3):
+            try:
+                # (connect, read) timeouts bound worst-case latency so a hung
+                # connection cannot block the scheduler past the next fire.
+                response = self.oauth.post("https://api.twitter.com/2/tweets", json=payload, timeout=(5, 15))
+            except requests.exceptions.RequestException as e:
+                logger.error("❌ Network error posting tweet: %s", e)
+                return None
+            except Exception as e:
+                logger.error("❌ Unexpected error posting tweet: %s", e)
+                return None
 
             if response.status_code == 201:
                 tweet_id = response.json()['data']['id']
-                self.posted_tweets.add(tweet_text)
-                logging.info(f"✅ Tweet posted successfully! ID: {tweet_id}")
-                logging.info(f"📝 Content: {tweet_text}")
+                with self._posted_lock:
+                    self.posted_hashes.add(_tweet_fingerprint(tweet_text))
+                    self._posted_token_sets.append(_tweet_tokens(tweet_text))
+                logger.info("✅ Tweet posted successfully! ID: %s", tweet_id)
+                logger.info("📝 Content: %s", tweet_text)
                 return tweet_id
-            else:
-                logging.error(f"❌ Twitter API error: {response.status_code}")
-                logging.error(f"Response: {response.text}")
-                return None
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"❌ Network error posting tweet: {e}")
-            return None
-        except Exception as e:
-            logging.error(f"❌ Unexpected error posting tweet: {e}")
+            if response.status_code == 429 and attempt < 2:
+                # Twitter reports the window reset as an epoch header
+                reset = response.headers.get('x-rate-limit-reset')
+                try:
+                    wait = max(1.0, float(reset) - time.time())
+                except (TypeError, ValueError):
+                    wait = 2 ** attempt + random.random()
+                wait = min(wait, 120)
+                logger.warning("⚠️ Twitter rate limit hit, retrying in %.0fs...", wait)
+                time.sleep(wait)
+                continue
+
+            if response.status_code >= 500 and attempt < 2:
+                wait = 2 ** attempt + random.random()
+                logger.warning("⚠️ Twitter API %s, retrying in %.1fs...", response.status_code, wait)
+                time.sleep(wait)
+                continue
+
+            logger.error("❌ Twitter API error: %s", response.status_code)
+            logger.error("Response: %s", response.text)
             return None
 
+        return None
+
+    def _select_topic(self):
+        """Pick a topic that has not been posted within the dedup window."""
+        if self._recent_topics is None:
+            self._load_recent_topics()
+
+        # Draw from a pre-shuffled deck so no topic repeats until the whole
+        # list has been used, skipping anything in the recent window.
+        for _ in range(2 * len(self.topics)):
+            if not self._topic_cycle:
+                self._topic_cycle.extend(random.sample(self.topics, len(self.topics)))
+            topic = self._topic_cycle.popleft()
+            if topic not in self._recent_topics:
+                return topic
+
+        logger.warning("⚠️ All topics recently posted. Picking a random one.")
+        return random.choice(self.topics)
+
+    def pregenerate_tweets(self, schedule_times):
+        """Generate one tweet per schedule slot up-front so fires only post."""
+        self._pregenerated = {}
+        self._recent_topics = None  # refresh once for the whole batch
+
+        # Pick all topics first (serial, uses the shared recent-topic set)...
+        picks = {}
+        for time_str in schedule_times:
+            topic = self._select_topic()
+            picks[time_str] = topic
+            self._recent_topics.add(topic)  # no repeats within the batch
+
+        # ...then overlap the network-bound Groq calls.
+        with ThreadPoolExecutor(max_workers=min(4, max(len(picks), 1))) as executor:
+            futures = {t: executor.submit(self.generate_tweet_with_groq, topic)
+                       for t, topic in picks.items()}
+            for time_str, future in futures.items():
+                tweet_text = future.result()
+                if tweet_text:
+                    self._pregenerated[time_str] = (picks[time_str], tweet_text)
+                    logger.info("📦 Pre-generated tweet for %s", time_str)
+
+    def post_pregenerated(self, schedule_time):
+        """Post a tweet generated at startup, falling back to live generation."""
+        pending = self._pregenerated.pop(schedule_time, None)
+        if not pending:
+            return self.generate_and_post(schedule_time)
+
+        topic, tweet_text = pending
+        tweet_id = self.post_tweet(tweet_text)
+        if tweet_id:
+            self.mark_posted(topic, tweet_text, tweet_id)
+            return tweet_text
+        return None
+
     def generate_and_post(self, schedule_time):
         """Generate and post a tweet, checking for recent topics."""
-        logging.info(f"➡️ Generating tweet for schedule: {schedule_time}")
+        logger.info("➡️ Generating tweet for schedule: %s", schedule_time)
 
-        topics_str = os.environ.get('TOPICS')
-        topics = json.loads(topics_str) if topics_str else [
-            "Reducing stockouts and overstock by tracking days of stock on hand",
-            "Optimizing transport costs through cost-per-trip and route analysis",
-            "Analyzing sales data to uncover slow-moving products",
-            "Predicting customer returns to prevent revenue loss",
-            "Tracking fleet performance and vehicle utilization for cost savings",
-            "Improving supplier performance using data insights",
-            "Forecasting demand to improve purchasing decisions",
-            "Identifying hidden inefficiencies in operations dashboards",
-            "Early warning signals for customer churn",
-            "Using inventory ABC analysis to free up working capital",
-            "Optimizing delivery schedules to reduce operational costs",
-            "Analyzing pricing strategies to increase profit margins",
-            "Monitoring key KPIs to improve business decision-making",
-            "Using historical sales data to improve forecast accuracy"
-        ]
-
-        # Use Google Sheets to pick a topic not used in the last 2 days
-        selected_topic = None
-        random.shuffle(topics)
-        for t in topics:
-            if not self.already_posted_topic(t):
-                selected_topic = t
-                break
-        
-        if not selected_topic:
-            selected_topic = random.choice(topics)
-            logging.warning("⚠️ All topics recently posted. Picking a random one.")
+        # Rebuild the recent-topic set from the locally cached rows when it
+        # is stale; mark_posted keeps the local copy current, so no extra
+        # Sheets API calls are needed.
+        if time.time() - self._recent_topics_built_at > 300:
+            self._recent_topics = None
+        selected_topic = self._select_topic()
 
         tweet_text = self.generate_tweet_with_groq(selected_topic)
 
@@ -312,62 +668,82 @@ Return only the tweet content, no hashtags, no explanations."""
                 self.mark_posted(selected_topic, tweet_text, tweet_id)
                 return tweet_text
         else:
-            logging.error(f"❌ Failed to generate or post tweet for {schedule_time}")
+            logger.error("❌ Failed to generate or post tweet for %s", schedule_time)
             return None
 
     def run_bot(self):
         """Main bot execution with scheduling"""
-        logging.info("🚀 Starting Twitter bot...")
+        logger.info("🚀 Starting Twitter bot...")
 
         if not self.oauth:
-            logging.error("❌ Twitter authentication failed. Exiting.")
+            logger.error("❌ Twitter authentication failed. Exiting.")
             return []
 
         posted_tweets = []
 
-        if os.environ.get('POST_IMMEDIATELY', 'false').lower() == 'true':
-            logging.info("🔹 Posting immediate tweet")
+        if self.post_immediately:
+            logger.info("🔹 Posting immediate tweet")
             tweet = self.generate_and_post("immediate")
             if tweet:
                 posted_tweets.append(tweet)
 
-        schedule_times_str = os.environ.get('SCHEDULE_TIMES', '["09:00", "14:00", "18:00"]')
-        schedule_times = json.loads(schedule_times_str)
+        if self.pregenerate:
+            logger.info("🔹 Pre-generating tweets for all schedule slots")
+            self.pregenerate_tweets(self.schedule_times)
 
-        for time_str in schedule_times:
+        # Tiny heap-based timer: (next_fire_epoch, time_str) per slot.
+        # O(log k) per fire and no per-minute job scanning.
+        jobs = []
+        for time_str in self.schedule_times:
             try:
-                schedule.every().day.at(time_str).do(lambda t=time_str: self.generate_and_post(t))
-                logging.info(f"⏰ Scheduled tweet for {time_str}")
-            except schedule.InvalidTimeError:
-                logging.error(f"❌ Invalid schedule time: {time_str}")
-
-        duration_hours = float(os.environ.get('RUN_DURATION_HOURS', '24'))
-        end_time = time.time() + (duration_hours * 60 * 60)
-
-        logging.info(f"🕒 Bot will run for {duration_hours} hours")
-
-        while time.time() < end_time and schedule.get_jobs():
-            schedule.run_pending()
-            time.sleep(60)
+                heapq.heappush(jobs, (_next_fire_epoch(time_str), time_str))
+                logger.info("⏰ Scheduled tweet for %s", time_str)
+            except ValueError:
+                logger.error("❌ Invalid schedule time: %s", time_str)
+
+        end_time = time.time() + (self.run_duration_hours * 60 * 60)
+
+        logger.info("🕒 Bot will run for %s hours", self.run_duration_hours)
+
+        while jobs and jobs[0][0] <= end_time:
+            next_fire, time_str = jobs[0]
+            delay = next_fire - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            if self.pregenerate:
+                tweet = self.post_pregenerated(time_str)
+            else:
+                tweet = self.generate_and_post(time_str)
+            if tweet:
+                posted_tweets.append(tweet)
+            heapq.heapreplace(jobs, (next_fire + 86400, time_str))
 
-        logging.info("✅ Bot execution completed")
+        self._flush_pending()
+        logger.info("✅ Bot execution completed")
         return posted_tweets
 
 def main():
+    _configure_logging()
+    bot = None
     try:
         bot = TwitterBot()
         posted_tweets = bot.run_bot()
-        logging.info(f"🎉 Session complete. Posted {len(posted_tweets)} tweets.")
+        logger.info("🎉 Session complete. Posted %d tweets.", len(posted_tweets))
 
         if posted_tweets:
-            logging.info("📋 Posted tweets:")
+            logger.info("📋 Posted tweets:")
             for i, tweet in enumerate(posted_tweets, 1):
-                logging.info(f"{i}. {tweet}")
+                logger.info("%s. %s", i, tweet)
 
     except KeyboardInterrupt:
-        logging.info("🛑 Bot stopped by user")
+        logger.info("🛑 Bot stopped by user")
     except Exception as e:
-        logging.error(f"❌ Fatal error: {e}")
+        logger.error("❌ Fatal error: %s", e)
+    finally:
+        if bot:
+            bot._flush_pending()
+        if _LOG_LISTENER:
+            _LOG_LISTENER.stop()
 
 if __name__ == "__main__":
     main()